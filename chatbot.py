@@ -1,7 +1,66 @@
 import streamlit as st
 import google.generativeai as genai
+import asyncio
+from collections import deque
+import concurrent.futures
 from datetime import datetime
+import hashlib
+import io
+import json
 import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# Minimum interval between placeholder updates while streaming (~30 Hz).
+# Re-rendering the markdown on every chunk makes Streamlit redraw the
+# whole chat per token, which freezes the UI on long responses.
+STREAM_FLUSH_INTERVAL = 1 / 30
+
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# Number of recent exchanges sent to the model as structured history
+HISTORY_WINDOW = 5
+
+# Responses are only memoized at low temperature, where repeating the
+# call would produce essentially the same answer anyway
+CACHEABLE_TEMPERATURE = 0.3
+
+# Hard cap on the characters of history sent per request, so a single
+# pathological long turn cannot inflate prefill cost for every later call
+HISTORY_CHAR_BUDGET = 6000
+
+# How often (in completed exchanges) to refresh the rolling summary of
+# turns that have fallen out of the history window
+SUMMARY_EVERY_N_TURNS = 10
+
+# Number of exchanges rendered per rerun; older ones are loaded on
+# demand so render cost stays O(K) instead of growing with the session
+VISIBLE_MESSAGES = 30
+
+# SQLite file holding the canonical chat history; session state only
+# keeps a bounded in-memory tail
+CHAT_DB_PATH = "chat_history.db"
+MAX_MESSAGES_IN_MEMORY = 200
+
+# Canned replies for trivial prompts that don't warrant an API roundtrip
+CANNED_RESPONSES = {
+    "hi": "👋 Hi! How can I help you today?",
+    "hello": "👋 Hello! What would you like to talk about?",
+    "hey": "👋 Hey! What can I do for you?",
+    "thanks": "You're welcome! Let me know if there's anything else.",
+    "thank you": "You're welcome! Happy to help anytime.",
+    "bye": "Goodbye! Come back anytime. 👋",
+    "goodbye": "Goodbye! It was nice chatting with you. 👋",
+}
+
+# Preset prompts offered next to the message box
+QUICK_PROMPTS = {
+    "💡 Explain AI": "What is artificial intelligence and how does it work?",
+    "📚 Help with coding": "Can you help me with a coding problem?",
+    "🎨 Creative writing": "Help me write a creative story or poem",
+}
 
 # Configure the page
 st.set_page_config(
@@ -11,38 +70,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_data
+def _css():
+    """Read the stylesheet once per process instead of on every rerun"""
+    css_path = os.path.join(os.path.dirname(__file__), "styles.css")
+    with open(css_path) as f:
+        return f.read()
+
 # Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: bold;
-        text-align: center;
-        color: #1f77b4;
-        margin-bottom: 2rem;
-    }
-    .chat-message {
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 1rem 0;
-        border-left: 4px solid;
-    }
-    .user-message {
-        background-color: #e3f2fd;
-        border-left-color: #2196f3;
-    }
-    .assistant-message {
-        background-color: #f3e5f5;
-        border-left-color: #9c27b0;
-    }
-    .sidebar-info {
-        background-color: #f0f2f6;
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 1rem 0;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(f"<style>{_css()}</style>", unsafe_allow_html=True)
 
 def initialize_session_state():
     """Initialize session state variables"""
@@ -52,57 +88,276 @@ def initialize_session_state():
         st.session_state.api_key_configured = False
     if "model" not in st.session_state:
         st.session_state.model = None
+    if "history_turns" not in st.session_state:
+        # Pre-formatted role/parts turns, appended once per completed
+        # exchange so the request path never rebuilds them
+        st.session_state.history_turns = deque(maxlen=HISTORY_WINDOW * 2)
+    if "rolling_summary" not in st.session_state:
+        # Plain dict rather than a bare string: the summary worker thread
+        # has no ScriptRunContext, so writing through the st.session_state
+        # proxy from it lands in a throwaway state object. Mutating a
+        # container created here on the main thread works from any thread.
+        st.session_state.rolling_summary = {"text": ""}
+    if "visible_count" not in st.session_state:
+        st.session_state.visible_count = VISIBLE_MESSAGES
+    if "turn_count" not in st.session_state:
+        # Completed exchanges this session; keeps growing even after the
+        # in-memory message list is trimmed to its cap
+        st.session_state.turn_count = 0
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if "errors" not in st.session_state:
+        # Plain list shared with worker threads; they append to the list
+        # object directly since the st.session_state proxy does not
+        # resolve to this session from a thread without a script context
+        st.session_state.errors = []
+
+@st.cache_resource
+def get_db():
+    """Open the shared SQLite connection holding the canonical history"""
+    conn = sqlite3.connect(CHAT_DB_PATH, check_same_thread=False)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            session_id TEXT NOT NULL,
+            ts TEXT NOT NULL,
+            user TEXT NOT NULL,
+            assistant TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+    return conn
+
+@st.cache_resource
+def _executor():
+    """Shared worker pool for I/O that should not block the response path"""
+    return concurrent.futures.ThreadPoolExecutor(max_workers=2)
+
+def save_turn_to_db(session_id, timestamp, user_text, assistant_text):
+    """Append one completed exchange to the SQLite history"""
+    conn = get_db()
+    conn.execute(
+        "INSERT INTO messages (session_id, ts, user, assistant) VALUES (?, ?, ?, ?)",
+        (session_id, timestamp.isoformat(), user_text, assistant_text)
+    )
+    conn.commit()
+
+def _persist_turn(errors, session_id, timestamp, user_text, assistant_text):
+    """Worker-thread wrapper around save_turn_to_db.
+
+    Failures are appended to the session's shared error list (st.error
+    cannot be called from a thread without a script context); the main
+    thread renders and drains the list on the next rerun.
+    """
+    try:
+        save_turn_to_db(session_id, timestamp, user_text, assistant_text)
+    except Exception as e:
+        errors.append(f"Failed to save chat turn: {e}")
+
+def count_session_messages(session_id):
+    """Number of exchanges stored for a session"""
+    row = get_db().execute(
+        "SELECT COUNT(*) FROM messages WHERE session_id = ?",
+        (session_id,)
+    ).fetchone()
+    return row[0]
+
+def load_messages_from_db(session_id, count):
+    """Load the most recent `count` exchanges for a session, oldest first"""
+    rows = get_db().execute(
+        "SELECT ts, user, assistant FROM messages WHERE session_id = ? "
+        "ORDER BY ts DESC LIMIT ?",
+        (session_id, count)
+    ).fetchall()
+    messages = []
+    for ts, user_text, assistant_text in reversed(rows):
+        timestamp = datetime.fromisoformat(ts)
+        messages.append({
+            "user": user_text,
+            "assistant": assistant_text,
+            "timestamp": timestamp,
+            "time_str": timestamp.strftime("%H:%M:%S"),
+        })
+    return messages
+
+def export_chat_rows(session_id):
+    """Yield export lines for a session straight from the database"""
+    conn = get_db()
+    rows = conn.execute(
+        "SELECT user, assistant FROM messages WHERE session_id = ? ORDER BY ts",
+        (session_id,)
+    )
+    for user_text, assistant_text in rows:
+        yield f"User: {user_text}\n"
+        yield f"Assistant: {assistant_text}\n"
+        yield "---\n"
+
+@st.cache_resource
+def get_model(api_key_hash, _api_key):
+    """Build the Gemini model once and share it across sessions/reruns.
+
+    Keyed on a hash of the API key (not the raw key) so the cache key
+    never holds the secret; the underscore prefix keeps the key itself
+    out of Streamlit's hashing entirely.
+    """
+    genai.configure(api_key=_api_key)
+    return genai.GenerativeModel(GEMINI_MODEL)
 
 def configure_gemini_api(api_key):
     """Configure the Gemini API with the provided key"""
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        model = get_model(api_key_hash, api_key)
         return model, True
     except Exception as e:
         st.error(f"Error configuring API: {str(e)}")
         return None, False
 
-def get_gemini_response(model, prompt, chat_history=None):
-    """Get response from Gemini API"""
+def maybe_canned(prompt):
+    """Return a canned reply for a trivial prompt, or None.
+
+    Greetings and thank-yous make up a real slice of traffic and need no
+    model call at all.
+    """
+    return CANNED_RESPONSES.get(prompt.strip().lower().rstrip("!.?, "))
+
+def _trim_history(history, budget=HISTORY_CHAR_BUDGET):
+    """Drop the oldest turns until the outbound history fits the budget.
+
+    Walks newest-to-oldest so the most recent context always survives,
+    then drops a leading model turn if trimming split an exchange
+    (Gemini history must start with a user turn).
+    """
+    kept = []
+    total = 0
+    for turn in reversed(history):
+        size = sum(len(part) for part in turn["parts"] if isinstance(part, str))
+        if total + size > budget:
+            break
+        kept.append(turn)
+        total += size
+
+    kept.reverse()
+    if kept and kept[0]["role"] == "model":
+        kept = kept[1:]
+    return kept
+
+def _warmup_model(model):
+    """Open the API channel with a 1-token call so the first user
+    message sees steady-state latency instead of cold-start cost"""
     try:
-        # Create a chat session for better context handling
-        chat = model.start_chat(history=[])
-        
-        # Add previous messages to context if available
-        if chat_history:
-            context = "\n".join([f"User: {msg['user']}\nAssistant: {msg['assistant']}" 
-                               for msg in chat_history[-5:]])  # Last 5 exchanges
-            full_prompt = f"Previous conversation:\n{context}\n\nCurrent question: {prompt}"
-        else:
-            full_prompt = prompt
-            
-        response = chat.send_message(full_prompt)
-        return response.text
+        model.generate_content("hi", generation_config={"max_output_tokens": 1})
+    except Exception:
+        pass
+
+def _update_rolling_summary(model, summary_box, older_messages):
+    """Summarize turns that fell out of the history window.
+
+    Runs in a daemon thread so the request path never waits on it; a
+    failed summary just keeps the previous one. Writes into the shared
+    dict from session state, not the st.session_state proxy, which does
+    not resolve to the real session from a plain thread.
+    """
+    try:
+        transcript = "\n".join(f"User: {msg['user']}\nAssistant: {msg['assistant']}"
+                               for msg in older_messages)
+        response = model.generate_content(
+            "Summarize this conversation in a few sentences so it can be "
+            f"used as context for later questions:\n{transcript}"
+        )
+        summary_box["text"] = response.text
+    except Exception:
+        pass
+
+async def get_gemini_response_async(model, prompt, history=None, temperature=0.7,
+                                    max_tokens=500, placeholder=None):
+    """Get response from Gemini API, streaming tokens into the UI as they arrive.
+
+    Async so the call can later be fanned out alongside other I/O-bound
+    work (guard checks, title generation) instead of running them
+    back-to-back. Raises on API failure; callers decide whether to show
+    the error or (for the cached path) let it skip memoization.
+    """
+    chat = model.start_chat(history=history or [])
+
+    # Decode cost is linear in output tokens, so the user's cap is a
+    # direct latency multiplier versus the server default
+    generation_config = genai.types.GenerationConfig(
+        temperature=temperature,
+        max_output_tokens=max_tokens
+    )
+
+    # Stream the response so the user sees tokens as they are produced
+    # instead of waiting for the full completion
+    if placeholder is None:
+        placeholder = st.empty()
+    response = await chat.send_message_async(prompt, stream=True,
+                                             generation_config=generation_config)
+
+    full_response = ""
+    last_flush = time.monotonic()
+    async for chunk in response:
+        if chunk.text:
+            full_response += chunk.text
+            # Batch chunks and flush at ~30 Hz (or on a sentence
+            # boundary) instead of re-rendering per token
+            now = time.monotonic()
+            if now - last_flush > STREAM_FLUSH_INTERVAL or chunk.text.rstrip().endswith((".", "!", "?")):
+                placeholder.markdown(full_response)
+                last_flush = now
+
+    # Final flush so the last buffered chunks are always shown
+    placeholder.markdown(full_response)
+    return full_response
+
+def get_gemini_response(model, prompt, history=None, temperature=0.7,
+                        max_tokens=500, placeholder=None):
+    """Synchronous entry point for the Streamlit script thread"""
+    try:
+        return asyncio.run(get_gemini_response_async(
+            model, prompt, history, temperature=temperature,
+            max_tokens=max_tokens, placeholder=placeholder
+        ))
     except Exception as e:
         return f"Error generating response: {str(e)}"
 
-def display_chat_message(role, content, timestamp=None):
-    """Display a chat message with proper styling"""
-    if timestamp:
-        time_str = timestamp.strftime("%H:%M:%S")
-    else:
+def _history_signature(history):
+    """Stable 16-byte digest of the outbound history for cache keying"""
+    return hashlib.blake2b(
+        json.dumps(history, sort_keys=True, default=str).encode(),
+        digest_size=16
+    ).hexdigest()
+
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
+def _cached_response(prompt, history_sig, temperature, max_tokens, model_id,
+                     _model, _history, _placeholder):
+    """Memoized Gemini call for deterministic (low-temperature) requests.
+
+    Only the plain arguments participate in the cache key; the model,
+    history and placeholder are underscore-prefixed so Streamlit never
+    hashes them. On a miss this streams live exactly like the uncached
+    path, and the caller re-renders the returned text on a hit. Calls
+    the raising async entry point directly: a failed call must propagate
+    so st.cache_data never memoizes an error message.
+    """
+    return asyncio.run(get_gemini_response_async(
+        _model, prompt, _history, temperature=temperature,
+        max_tokens=max_tokens, placeholder=_placeholder
+    ))
+
+def display_chat_message(role, content, time_str=None):
+    """Display a chat message in a native chat container.
+
+    st.chat_message lets Streamlit delta-diff the history instead of
+    re-parsing a raw HTML block per message on every rerun. The time
+    string is formatted once when the message is stored, not on every
+    render.
+    """
+    if time_str is None:
         time_str = datetime.now().strftime("%H:%M:%S")
-    
-    if role == "user":
-        st.markdown(f"""
-        <div class="chat-message user-message">
-            <strong>You ({time_str}):</strong><br>
-            {content}
-        </div>
-        """, unsafe_allow_html=True)
-    else:
-        st.markdown(f"""
-        <div class="chat-message assistant-message">
-            <strong>AI Assistant ({time_str}):</strong><br>
-            {content}
-        </div>
-        """, unsafe_allow_html=True)
+
+    with st.chat_message("user" if role == "user" else "assistant"):
+        st.write(content)
+        st.caption(time_str)
 
 def main():
     # Initialize session state
@@ -130,6 +385,17 @@ def main():
                     st.session_state.model = model
                     st.session_state.api_key_configured = True
                     st.success("✅ API configured successfully!")
+
+                    # Fire a throwaway 1-token generation in the background
+                    # so the connection handshake and model cold start are
+                    # paid now, not on the first real message
+                    if not st.session_state.setdefault("warmed", False):
+                        st.session_state.warmed = True
+                        threading.Thread(
+                            target=_warmup_model,
+                            args=(model,),
+                            daemon=True
+                        ).start()
                 else:
                     st.session_state.api_key_configured = False
         
@@ -167,23 +433,32 @@ def main():
         with col1:
             if st.button("Clear Chat", type="secondary"):
                 st.session_state.messages = []
+                st.session_state.history_turns.clear()
+                st.session_state.rolling_summary["text"] = ""
+                st.session_state.turn_count = 0
+                get_db().execute(
+                    "DELETE FROM messages WHERE session_id = ?",
+                    (st.session_state.session_id,)
+                )
+                get_db().commit()
                 st.rerun()
-        
+
         with col2:
-            if st.button("Export Chat"):
-                if st.session_state.messages:
-                    chat_export = []
-                    for msg in st.session_state.messages:
-                        chat_export.append(f"User: {msg['user']}")
-                        chat_export.append(f"Assistant: {msg['assistant']}")
-                        chat_export.append("---")
-                    
-                    st.download_button(
-                        label="Download Chat History",
-                        data="\n".join(chat_export),
-                        file_name=f"chat_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                        mime="text/plain"
-                    )
+            # Build the export only when asked for, not on every rerun
+            # that happens to draw the sidebar
+            if st.button("Prepare Export"):
+                buf = io.StringIO()
+                for line in export_chat_rows(st.session_state.session_id):
+                    buf.write(line)
+                st.session_state.export_blob = buf.getvalue()
+
+        if st.session_state.get("export_blob"):
+            st.download_button(
+                label="Download Chat History",
+                data=st.session_state.export_blob,
+                file_name=f"chat_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                mime="text/plain"
+            )
         
         # Info section
         st.markdown("---")
@@ -212,79 +487,160 @@ def main():
         display_chat_message("assistant", "Artificial Intelligence (AI) is a branch of computer science that focuses on creating systems capable of performing tasks that typically require human intelligence. This includes learning, reasoning, problem-solving, perception, and language understanding. AI systems can analyze data, recognize patterns, and make decisions to solve complex problems across various domains like healthcare, finance, transportation, and more.")
         
     else:
+        # Surface failures collected by worker threads since the last run
+        if st.session_state.errors:
+            for err in st.session_state.errors:
+                st.error(err)
+            # clear() keeps the list identity that in-flight workers hold
+            st.session_state.errors.clear()
+
         # Chat container
         chat_container = st.container()
         
         # Display chat history
         with chat_container:
             if st.session_state.messages:
-                for message in st.session_state.messages:
-                    display_chat_message("user", message["user"], message.get("timestamp"))
-                    display_chat_message("assistant", message["assistant"], message.get("timestamp"))
+                # Paging past the in-memory tail pulls the older turns
+                # back out of SQLite, which holds the canonical history
+                if st.session_state.visible_count > len(st.session_state.messages):
+                    db_messages = load_messages_from_db(
+                        st.session_state.session_id,
+                        st.session_state.visible_count
+                    )
+                    if len(db_messages) > len(st.session_state.messages):
+                        st.session_state.messages = db_messages
+
+                # Only render the tail of the conversation; older turns
+                # are revealed on demand so long sessions stay responsive
+                total = max(count_session_messages(st.session_state.session_id),
+                            len(st.session_state.messages))
+                hidden = total - st.session_state.visible_count
+                if hidden > 0:
+                    if st.button(f"Load older messages ({hidden} hidden)"):
+                        st.session_state.visible_count += VISIBLE_MESSAGES
+                        st.rerun()
+
+                visible = st.session_state.messages[-st.session_state.visible_count:]
+                for message in visible:
+                    display_chat_message("user", message["user"], message.get("time_str"))
+                    display_chat_message("assistant", message["assistant"], message.get("time_str"))
             else:
                 st.info("👋 Hi! I'm your AI assistant. Ask me anything to get started!")
         
         # Chat input
-        with st.form(key="chat_form", clear_on_submit=True):
-            col1, col2 = st.columns([4, 1])
-            
-            with col1:
-                user_input = st.text_area(
-                    "Your message:",
-                    placeholder="Type your message here...",
-                    height=100,
-                    key="user_input"
-                )
-            
-            with col2:
-                submit_button = st.form_submit_button("Send 📤", type="primary", use_container_width=True)
-                
-                # Quick action buttons
-                st.markdown("**Quick Actions:**")
-                if st.form_submit_button("💡 Explain AI", use_container_width=True):
-                    user_input = "What is artificial intelligence and how does it work?"
-                    submit_button = True
-                
-                if st.form_submit_button("📚 Help with coding", use_container_width=True):
-                    user_input = "Can you help me with a coding problem?"
-                    submit_button = True
-                
-                if st.form_submit_button("🎨 Creative writing", use_container_width=True):
-                    user_input = "Help me write a creative story or poem"
-                    submit_button = True
-        
+        # Quick prompts: selecting one sends it as the next message
+        preset = st.selectbox(
+            "Quick prompt",
+            [""] + list(QUICK_PROMPTS),
+            help="Optional preset prompt sent as your next message"
+        )
+
+        user_input = st.chat_input("Type your message here...")
+        if not preset:
+            # Clearing the selectbox re-arms the presets so the same one
+            # can be sent again later in the session
+            st.session_state.last_preset = ""
+        elif not user_input and preset != st.session_state.get("last_preset"):
+            st.session_state.last_preset = preset
+            user_input = QUICK_PROMPTS[preset]
+
         # Process user input
-        if submit_button and user_input.strip():
-            # Add user message to history
+        if user_input and user_input.strip():
+            # Add user message to history; format the display time
+            # once here so reruns just copy the stored string
             timestamp = datetime.now()
-            
-            # Show user message immediately
-            display_chat_message("user", user_input, timestamp)
-            
-            # Show loading spinner
-            with st.spinner("🤔 Thinking..."):
-                # Get AI response
-                chat_history = [{"user": msg["user"], "assistant": msg["assistant"]} 
-                              for msg in st.session_state.messages]
-                
-                ai_response = get_gemini_response(
-                    st.session_state.model, 
-                    user_input, 
-                    chat_history
-                )
-            
-            # Display AI response
-            display_chat_message("assistant", ai_response, timestamp)
-            
-            # Save to session state
+            time_str = timestamp.strftime("%H:%M:%S")
+
+            # Render this turn once, inline; the next natural rerun
+            # picks it up from history with no explicit st.rerun()
+            display_chat_message("user", user_input, time_str)
+
+            # Trivial prompts (greetings, thanks) get a canned reply
+            # with zero API calls
+            canned = maybe_canned(user_input)
+            if canned is not None:
+                with st.chat_message("assistant"):
+                    st.write(canned)
+                ai_response = canned
+            else:
+                # Get AI response (streamed into a placeholder as it
+                # arrives). History turns are pre-formatted when each
+                # exchange completes, so this is just a copy of the
+                # rolling window.
+                history = list(st.session_state.history_turns)
+                rolling_summary = st.session_state.rolling_summary["text"]
+                if rolling_summary:
+                    history = [
+                        {"role": "user", "parts": [f"Summary of our earlier conversation: {rolling_summary}"]},
+                        {"role": "model", "parts": ["Understood, I'll keep that context in mind."]},
+                    ] + history
+                history = _trim_history(history)
+
+                with st.chat_message("assistant"):
+                    if temperature <= CACHEABLE_TEMPERATURE:
+                        # Deterministic enough to memoize: a repeat of
+                        # the same prompt+context is a hash lookup. A
+                        # failed call raises out of the cached function,
+                        # so only successful responses are stored.
+                        placeholder = st.empty()
+                        try:
+                            ai_response = _cached_response(
+                                user_input,
+                                _history_signature(history),
+                                temperature,
+                                max_tokens,
+                                GEMINI_MODEL,
+                                st.session_state.model,
+                                history,
+                                placeholder
+                            )
+                        except Exception as e:
+                            ai_response = f"Error generating response: {str(e)}"
+                        placeholder.markdown(ai_response)
+                    else:
+                        ai_response = get_gemini_response(
+                            st.session_state.model,
+                            user_input,
+                            history,
+                            temperature=temperature,
+                            max_tokens=max_tokens
+                        )
+
+            # Persist the turn; SQLite is the canonical store and the
+            # in-memory list is just a bounded render tail. The write
+            # happens on a worker so the UI never waits on disk I/O.
+            _executor().submit(
+                _persist_turn,
+                st.session_state.errors,
+                st.session_state.session_id,
+                timestamp,
+                user_input,
+                ai_response
+            )
             st.session_state.messages.append({
                 "user": user_input,
                 "assistant": ai_response,
-                "timestamp": timestamp
+                "timestamp": timestamp,
+                "time_str": time_str
             })
-            
-            # Rerun to update the interface
-            st.rerun()
+            if len(st.session_state.messages) > MAX_MESSAGES_IN_MEMORY:
+                del st.session_state.messages[:-MAX_MESSAGES_IN_MEMORY]
+            st.session_state.history_turns.append({"role": "user", "parts": [user_input]})
+            st.session_state.history_turns.append({"role": "model", "parts": [ai_response]})
+            st.session_state.turn_count += 1
+
+            # Periodically refresh the summary of turns that no longer
+            # fit in the rolling window, off the critical path. Keyed
+            # on the monotonic turn counter: the message list length is
+            # pinned at its cap once trimming kicks in.
+            if st.session_state.turn_count % SUMMARY_EVERY_N_TURNS == 0:
+                older_messages = st.session_state.messages[:-HISTORY_WINDOW]
+                if older_messages:
+                    threading.Thread(
+                        target=_update_rolling_summary,
+                        args=(st.session_state.model, st.session_state.rolling_summary, older_messages),
+                        daemon=True
+                    ).start()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file